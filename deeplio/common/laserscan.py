@@ -6,9 +6,60 @@ https://github.com/PRBonn/lidar-bonnetal
 import numpy as np
 import open3d as o3d
 
+try:
+    import numba
+except ImportError:
+    numba = None
+
 from deeplio.common import utils
 
 
+def _project_points(points, H, W, fov_up, fov_down):
+    """ Calculate the image coordinates and the depth of each point in the spherical projection.
+        fov_up and fov_down are given in rad.
+    """
+    fov = abs(fov_down) + abs(fov_up)
+    n = points.shape[0]
+    proj_x = np.empty(n, dtype=np.int32)
+    proj_y = np.empty(n, dtype=np.int32)
+    depth = np.empty(n, dtype=np.float32)
+    for i in range(n):
+        x, y, z = points[i, 0], points[i, 1], points[i, 2]
+        d = np.sqrt(x * x + y * y + z * z)
+        yaw = -np.arctan2(y, x)
+        pitch = np.arcsin(z / d)
+
+        # get projections in image coords and scale to image size
+        u = np.floor(0.5 * (yaw / np.pi + 1.0) * W)
+        v = np.floor((1.0 - (pitch + abs(fov_down)) / fov) * H)
+
+        # clamp for use as index
+        proj_x[i] = min(W - 1, max(0, u))
+        proj_y[i] = min(H - 1, max(0, v))
+        depth[i] = d
+    return proj_x, proj_y, depth
+
+
+def _scatter_points(points, remissions, proj_x, proj_y, depth,
+                    proj_range, proj_xyz, proj_remission, proj_idx):
+    """ Write each point to its pixel, if it is the closest point projected to that pixel so far. """
+    for i in range(points.shape[0]):
+        u, v = proj_x[i], proj_y[i]
+        if proj_range[v, u] == 0. or depth[i] < proj_range[v, u]:
+            proj_range[v, u] = depth[i]
+            proj_xyz[v, u, 0] = points[i, 0]
+            proj_xyz[v, u, 1] = points[i, 1]
+            proj_xyz[v, u, 2] = points[i, 2]
+            proj_remission[v, u] = remissions[i]
+            proj_idx[v, u] = i
+
+
+if numba is not None:
+    # the compiled loops release the GIL, so several scans can be projected in parallel threads
+    _project_points = numba.njit(nogil=True, fastmath=True, cache=True)(_project_points)
+    _scatter_points = numba.njit(nogil=True, cache=True)(_scatter_points)
+
+
 class LaserScan:
     """Class that contains LaserScan with x,y,z,r"""
     EXTENSIONS_SCAN = ['.bin', '.txt', '.npy']
@@ -22,6 +73,7 @@ class LaserScan:
         self.proj_fov_down = fov_down
         self.max_depth = max_depth
         self.min_depth = min_depth
+        self.proj_range = None
         self.reset()
 
     def reset(self):
@@ -29,14 +81,27 @@ class LaserScan:
         self.points = np.zeros((0, 3), dtype=np.float32)        # [m, 3]: x, y, z
         self.remissions = np.zeros((0, 1), dtype=np.float32)    # [m ,1]: remission
 
+        # unprojected range (list of depths for each point)
+        self.unproj_range = np.zeros((0, 1), dtype=np.float32)
+
+        # for each point, where it is in the range image
+        self.proj_x = np.zeros((0, 1), dtype=np.int32)        # [m, 1]: x
+        self.proj_y = np.zeros((0, 1), dtype=np.int32)        # [m, 1]: y
+
+        # the projected images are allocated once and only cleared when the scan is reused
+        if self.proj_range is not None:
+            self.proj_range.fill(0.)
+            self.proj_xyz.fill(0.)
+            self.proj_remission.fill(0.)
+            self.proj_idx.fill(0)
+            self.proj_mask.fill(0)
+            return
+
         # projected range image - [H,W] range (-1 is no data)
         self.proj_range = np.full((self.proj_H, self.proj_W), 0., dtype=np.float32)
 
         #self.proj_range_xy = np.full((self.proj_H, self.proj_W), 0., dtype=np.float32)
 
-        # unprojected range (list of depths for each point)
-        self.unproj_range = np.zeros((0, 1), dtype=np.float32)
-
         # projected point cloud xyz - [H,W,3] xyz coord (-1 is no data)
         self.proj_xyz = np.full((self.proj_H, self.proj_W, 3), 0,
                                 dtype=np.float32)
@@ -50,10 +115,6 @@ class LaserScan:
         self.proj_idx = np.full((self.proj_H, self.proj_W), 0,
                                 dtype=np.int32)
 
-        # for each point, where it is in the range image
-        self.proj_x = np.zeros((0, 1), dtype=np.int32)        # [m, 1]: x
-        self.proj_y = np.zeros((0, 1), dtype=np.int32)        # [m, 1]: y
-
         # mask containing for each pixel, if it contains a point or not
         self.proj_mask = np.zeros((self.proj_H, self.proj_W),
                                   dtype=np.int32)       # [H,W] mask
@@ -125,6 +186,27 @@ class LaserScan:
             if the value of the constructor was not set (in case you change your
             mind about wanting the projection)
         """
+        if numba is not None:
+            self._do_range_projection_numba()
+        else:
+            self._do_range_projection_numpy()
+
+    def _do_range_projection_numba(self):
+        # laser parameters
+        fov_up = self.proj_fov_up / 180.0 * np.pi      # field of view up in rad
+        fov_down = self.proj_fov_down / 180.0 * np.pi  # field of view down in rad
+
+        # instead of sorting the points by depth, the closest point of each pixel wins the depth test
+        proj_x, proj_y, depth = _project_points(self.points, self.proj_H, self.proj_W, fov_up, fov_down)
+        _scatter_points(self.points, self.remissions, proj_x, proj_y, depth,
+                        self.proj_range, self.proj_xyz, self.proj_remission, self.proj_idx)
+
+        self.proj_x = proj_x
+        self.proj_y = proj_y
+        self.unproj_range = depth
+        self.proj_mask[:] = self.proj_idx > 0
+
+    def _do_range_projection_numpy(self):
         # laser parameters
         fov_up = self.proj_fov_up / 180.0 * np.pi      # field of view up in rad
         fov_down = self.proj_fov_down / 180.0 * np.pi  # field of view down in rad
@@ -182,8 +264,7 @@ class LaserScan:
         self.proj_xyz[proj_y, proj_x] = points
         self.proj_remission[proj_y, proj_x] = remission
         self.proj_idx[proj_y, proj_x] = indices
-        self.proj_mask = (self.proj_idx > 0).astype(np.int32)
-
+        self.proj_mask[:] = self.proj_idx > 0
 
     def do_normal_projection1(self):
         # projected range image - [H,W] range (-1 is no data)
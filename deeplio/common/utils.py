@@ -4,6 +4,7 @@
  - and some other useful functions
 """
 
+import os
 from collections import namedtuple
 
 import matplotlib
@@ -12,6 +13,11 @@ import numpy as np
 import open3d as o3d
 from PIL import Image
 
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
 # Per dataformat.txt
 OxtsPacket = namedtuple('OxtsPacket',
                         'lat, lon, alt, ' +
@@ -108,39 +114,111 @@ def pose_from_oxts_packet(packet, scale):
     return R, t
 
 
+def poses_from_oxts(oxts):
+    """Compute the SE(3) poses of all OXTS measurements at once.
+
+       :param oxts: OXTS values of dimension [Nx30] as given by load_oxts
+       :return: poses of dimension [Nx4x4], whose origin is the first GPS position
+    """
+    er = 6378137.  # earth radius (approx.) in meters
+    lat, lon, alt = oxts[:, 0], oxts[:, 1], oxts[:, 2]
+    roll, pitch, yaw = oxts[:, 3], oxts[:, 4], oxts[:, 5]
+
+    # Scale for Mercator projection (from first lat value)
+    scale = np.cos(lat[0] * np.pi / 180.)
+
+    # Use a Mercator projection to get the translation vector
+    tx = scale * lon * np.pi * er / 180.
+    ty = scale * er * np.log(np.tan((90. + lat) * np.pi / 360.))
+    tz = alt
+    t = np.stack((tx, ty, tz), axis=1)
+
+    # Use the Euler angles to get the rotation matrix R = Rz * Ry * Rx
+    cr, sr = np.cos(roll), np.sin(roll)
+    cp, sp = np.cos(pitch), np.sin(pitch)
+    cy, sy = np.cos(yaw), np.sin(yaw)
+
+    n = len(oxts)
+    T = np.zeros((n, 4, 4))
+    T[:, 0, 0] = cy * cp
+    T[:, 0, 1] = cy * sp * sr - sy * cr
+    T[:, 0, 2] = cy * sp * cr + sy * sr
+    T[:, 1, 0] = sy * cp
+    T[:, 1, 1] = sy * sp * sr + cy * cr
+    T[:, 1, 2] = sy * sp * cr - cy * sr
+    T[:, 2, 0] = -sp
+    T[:, 2, 1] = cp * sr
+    T[:, 2, 2] = cp * cr
+
+    # Origin of the global coordinate system (first GPS position)
+    T[:, :3, 3] = t - t[0]
+    T[:, 3, 3] = 1.
+    return T
+
+
+def load_oxts(oxts_files):
+    """Read OXTS files as a numpy.array of dimension [Nx30], one row per measurement.
+
+       All files are read at once, so the values are converted in a single call to numpy.
+    """
+    contents = []
+    for filename in oxts_files:
+        with open(filename, 'r') as f:
+            contents.append(f.read())
+    return np.array(" ".join(contents).split(), dtype=np.float64).reshape(-1, len(OxtsPacket._fields))
+
+
 def load_oxts_packets_and_poses(oxts_files):
     """Generator to read OXTS ground truth data.
 
        Poses are given in an East-North-Up coordinate system
        whose origin is the first GPS position.
     """
-    # Scale for Mercator projection (from first lat value)
-    scale = None
-    # Origin of the global coordinate system (first GPS position)
-    origin = None
+    values = load_oxts(oxts_files)
+    if len(values) == 0:
+        return []
+    poses = poses_from_oxts(values)
 
     oxts = []
-    for filename in oxts_files:
-        with open(filename, 'r') as f:
-            for line in f.readlines():
-                line = line.split()
-                # Last five entries are flags and counts
-                line[:-5] = [float(x) for x in line[:-5]]
-                line[-5:] = [int(float(x)) for x in line[-5:]]
+    for line, T_w_imu in zip(values.tolist(), poses):
+        # Last five entries are flags and counts
+        line[-5:] = [int(x) for x in line[-5:]]
+        packet = OxtsPacket(*line)
+        oxts.append(OxtsData(packet, T_w_imu))
+    return oxts
+
 
-                packet = OxtsPacket(*line)
+def parse_timestamps(lines):
+    """Parse KITTI timestamps as a numpy.array of datetime64[ns].
 
-                if scale is None:
-                    scale = np.cos(packet.lat * np.pi / 180.)
+    The timestamps have the fixed format 'YYYY-MM-DD HH:MM:SS.FFFFFFFFF', so the fields
+    are read from fixed columns of the characters without parsing each line in python.
+    """
+    chars = np.array(lines, dtype='S29').view(np.uint8).reshape(-1, 29)
+    days = chars[:, 0:10].copy().view('S10').ravel().astype('datetime64[D]')
+    digits = chars.astype(np.int64) - ord('0')
 
-                R, t = pose_from_oxts_packet(packet,  scale)
+    def to_int(start, stop):
+        weights = 10 ** np.arange(stop - start - 1, -1, -1, dtype=np.int64)
+        return digits[:, start:stop].dot(weights)
 
-                if origin is None:
-                    origin = t
+    seconds = to_int(11, 13) * 3600 + to_int(14, 16) * 60 + to_int(17, 19)
+    stamps = days.astype('datetime64[ns]').astype(np.int64) + seconds * 1000000000 + to_int(20, 29)
+    return stamps.view('datetime64[ns]')
 
-                T_w_imu = transform_from_rot_trans(R, t - origin)
-                oxts.append(OxtsData(packet, T_w_imu))
-    return oxts
+
+def load_timestamps(filename):
+    """Read a KITTI timestamps file as a numpy.array of datetime64[ns]."""
+    with open(filename, 'r') as f:
+        lines = [line for line in f.read().splitlines() if line]
+
+    if pd is None:
+        return parse_timestamps(lines)
+
+    # parse all lines at once in C instead of calling strptime per line,
+    # datetime64[ns] also keeps the nanoseconds given by KITTI
+    stamps = pd.to_datetime(lines, format='%Y-%m-%d %H:%M:%S.%f', cache=True)
+    return stamps.values.astype('datetime64[ns]')
 
 
 def load_image(file, mode):
@@ -166,8 +244,14 @@ def load_velo_scan(file):
 
 
 def load_velo_scan_bin(file):
-    """Load and parse a velodyne binary file."""
-    scan = np.fromfile(file, dtype=np.float32)
+    """Load and parse a velodyne binary file.
+
+    The file is memory-mapped read-only, so the scan is read from the page cache without an extra copy.
+    """
+    # empty files can not be memory-mapped
+    if os.path.getsize(file) == 0:
+        return np.empty((0, 4), dtype=np.float32)
+    scan = np.memmap(file, dtype=np.float32, mode='r')
     return scan.reshape((-1, 4))
 
 
@@ -1,9 +1,8 @@
-import datetime as dt
-import glob
 import os
 import pickle
-import time  # for start stop calc
-from threading import Thread
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, local
 
 import numpy as np
 import torch
@@ -12,6 +11,63 @@ import torch.utils.data as data
 from deeplio.common import utils, logger
 from deeplio.common.laserscan import LaserScan
 
+_executor = None
+_executor_pid = None
+
+_file_lists = {}
+_file_lists_lock = Lock()
+
+_scans = local()
+
+
+def _get_executor(max_workers):
+    """Get the thread pool of the current process.
+
+    A forked dataloader worker can not use the pool of its parent, since the threads of the parent are not forked.
+    """
+    global _executor, _executor_pid
+
+    if _executor is None or _executor_pid != os.getpid():
+        _executor = ThreadPoolExecutor(max_workers=min(max_workers, os.cpu_count() or 1))
+        _executor_pid = os.getpid()
+    return _executor
+
+
+def _list_files(path, ext):
+    """List the sorted files with the given extension in path.
+
+    The listing is cached, since the same drives are opened again, e.g. for each split or worker.
+    """
+    key = (path, ext)
+    with _file_lists_lock:
+        files = _file_lists.get(key)
+        if files is None:
+            try:
+                with os.scandir(path) as entries:
+                    files = sorted(entry.path for entry in entries if entry.name.endswith(ext) and entry.is_file())
+            except FileNotFoundError:
+                files = []
+            _file_lists[key] = files
+    return list(files)
+
+
+def _get_scan(H, W, fov_up, fov_down, min_depth, max_depth):
+    """Get the laser scan of the current thread for the given projection parameters.
+
+    The buffers of a scan only depend on these parameters, so the scan is reused for all drives.
+    """
+    scans = getattr(_scans, 'scans', None)
+    if scans is None:
+        scans = _scans.scans = {}
+
+    key = (H, W, fov_up, fov_down, min_depth, max_depth)
+    scan = scans.get(key)
+    if scan is None:
+        scan = LaserScan(project=False, H=H, W=W, fov_up=fov_up, fov_down=fov_down,
+                         min_depth=min_depth, max_depth=max_depth)
+        scans[key] = scan
+    return scan
+
 
 class KittiRawData:
     """ KiitiRawData
@@ -30,6 +86,12 @@ class KittiRawData:
         "2011_09_30_0034": 10,
     }
 
+    # channels of a projected image: x, y, z, remission, nx, ny, nz, range
+    NUM_IMAGE_CHANNELS = 8
+    # projected images are network inputs, for which half precision is accurate enough,
+    # e.g. ranges below 128 m are rounded to at most 0.0625 m
+    IMAGE_DTYPE = np.float16
+
     def __init__(self, base_path_sync, base_path_unsync, date, drive,
                  cfg=None, oxts_bin=False, oxts_txt=False, max_points=150000, **kwargs):
         self.drive = drive
@@ -57,6 +119,24 @@ class KittiRawData:
             self.fov_down = ds_config.get('fov-down', -25)
             self.max_depth = ds_config.get('max-depth', 80)
             self.min_depth = ds_config.get('min-depth', 2)
+            # when iterating in order, adjacent sequences share all but one frame, so keeping the last two
+            # sequences of projected images avoids projecting the same frame over and over again.
+            # Shuffled samples hardly ever hit the cache, so it is only used if enabled.
+            if ds_config.get('projection-cache', False):
+                self.proj_cache_size = 2 * (cfg.get('sequence-size', 1) + 1)
+            else:
+                self.proj_cache_size = 0
+            # precomputed projections are only valid for the projection parameters they were computed with
+            self.proj_path = os.path.join(self.data_path_sync, 'velodyne_points',
+                                          'proj_{}x{}_{}_{}_{}_{}'.format(self.image_height, self.image_width,
+                                                                          self.fov_up, self.fov_down,
+                                                                          self.min_depth, self.max_depth))
+            self.has_proj_files = os.path.isdir(self.proj_path)
+        else:
+            self.proj_cache_size = 0
+            self.has_proj_files = False
+        self._proj_cache = OrderedDict()
+        self._proj_cache_lock = Lock()
 
         # Find all the data files
         self._get_velo_files()
@@ -71,48 +151,116 @@ class KittiRawData:
             self._get_oxt_files()
             self._load_oxts()
 
+        if oxts_bin or oxts_txt:
+            self._build_oxts_arrays()
+
         self.imu_get_counter = 0
 
     def __len__(self):
         return len(self.velo_files)
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # locks can not be pickled, e.g. when passing the dataset to another process
+        del state['_proj_cache_lock']
+        state['_proj_cache'] = OrderedDict()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._proj_cache_lock = Lock()
+
     def get_velo(self, idx):
         """Read velodyne [x,y,z,reflectance] scan at the specified index."""
         return utils.load_velo_scan(self.velo_files[idx])
 
-    def get_velo_image(self, idx):
-        scan = LaserScan(project=False, H=self.image_height, W=self.image_width, fov_up=self.fov_up, fov_down=self.fov_down,
-                         min_depth=self.min_depth, max_depth=self.max_depth)
+    def get_velo_image(self, idx, out=None):
+        """Get the projected velodyne image at the specified index.
+
+        If out is given, the image is written into it. Otherwise the returned image can be shared
+        with the projection cache, so it must not be modified in-place.
+        """
+        if self.proj_cache_size > 0:
+            with self._proj_cache_lock:
+                image = self._proj_cache.get(idx)
+                if image is not None:
+                    self._proj_cache.move_to_end(idx)
+
+            if image is not None:
+                if out is None:
+                    return image
+                np.copyto(out, image)
+                return out
+
+        image = self._load_velo_image(idx, out)
+
+        if self.proj_cache_size > 0:
+            # out belongs to the caller, so the cache keeps its own copy
+            cached = image if out is None else image.copy()
+            with self._proj_cache_lock:
+                self._proj_cache[idx] = cached
+                if len(self._proj_cache) > self.proj_cache_size:
+                    self._proj_cache.popitem(last=False)
+        return image
+
+    def precompute_projections(self):
+        """Project all velodyne frames once and save them as .npy files to the projection path."""
+        os.makedirs(self.proj_path, exist_ok=True)
+        for idx in range(len(self)):
+            proj_file = self._get_proj_file(idx)
+            if os.path.exists(proj_file):
+                continue
+
+            image = self._project_velo_image(idx)
+            # write to a temporary file first, so readers never see a partially written projection
+            tmp_file = "{}.tmp".format(proj_file)
+            with open(tmp_file, 'wb') as f:
+                np.save(f, image)
+            os.replace(tmp_file, proj_file)
+        self.has_proj_files = True
+
+    def _get_proj_file(self, idx):
+        name = os.path.splitext(os.path.basename(self.velo_files[idx]))[0]
+        return os.path.join(self.proj_path, '{}.npy'.format(name))
+
+    def _load_velo_image(self, idx, out=None):
+        if self.has_proj_files:
+            proj_file = self._get_proj_file(idx)
+            if os.path.exists(proj_file):
+                image = np.load(proj_file, mmap_mode='r')
+                if out is None:
+                    return np.array(image)
+                np.copyto(out, image)
+                return out
+        return self._project_velo_image(idx, out)
+
+    def _project_velo_image(self, idx, out=None):
+        # each loader thread reuses its own laser scan and the buffers of it
+        scan = _get_scan(self.image_height, self.image_width, self.fov_up, self.fov_down,
+                         self.min_depth, self.max_depth)
         scan.open_scan(self.velo_files[idx])
         scan.do_range_projection()
         scan.do_normal_projection()
 
-        # get projected data
-        proj_xyz = scan.proj_xyz / self.max_depth
-        proj_remission = scan.proj_remission
-        proj_range = scan.proj_range
-        proj_normal = scan.proj_normal
+        if out is None:
+            out = np.empty((self.image_height, self.image_width, self.NUM_IMAGE_CHANNELS), dtype=self.IMAGE_DTYPE)
 
-        image = np.dstack((proj_xyz, proj_remission, proj_normal, proj_range))
-        return image
+        # copy the projected data directly into the channels of the image
+        np.divide(scan.proj_xyz, self.max_depth, out=out[..., 0:3], casting='same_kind')
+        out[..., 3] = scan.proj_remission
+        out[..., 4:7] = scan.proj_normal
+        out[..., 7] = scan.proj_range
+        return out
 
     def get_imu_values(self, idx):
-        oxt = self.oxts_unsync[idx]
-        imu_values = np.array([[oxt[0].ax, oxt[0].ay, oxt[0].az,
-                                oxt[0].wx, oxt[0].wy, oxt[0].wz]
-                               for oxt in oxt], dtype=np.float)
-        return imu_values
+        return self.imu_unsync[idx]
 
     def _get_velo_files(self):
         # first try to get binary files
-        self.velo_files = sorted(glob.glob(
-            os.path.join(self.data_path_sync, 'velodyne_points',
-                         'data', '*.bin')))
+        self.velo_files = _list_files(os.path.join(self.data_path_sync, 'velodyne_points', 'data'), '.bin')
         # if there is no bin files for velo, so the velo file are in text format
-        if self.velo_files is None:
-            self.velo_files = sorted(glob.glob(
-                os.path.join(self.data_path_unsync, 'velodyne_points',
-                             'data', '*.txt')))
+        if not self.velo_files:
+            self.velo_files = _list_files(os.path.join(self.data_path_unsync, 'velodyne_points', 'data'), '.txt')
 
         # Subselect the chosen range of frames, if any
         if self.frames is not None:
@@ -122,16 +270,14 @@ class KittiRawData:
 
     def _get_oxt_files(self):
         """Find and list data files for each sensor."""
-        self.oxts_files_sync = sorted(glob.glob(
-            os.path.join(self.data_path_sync, 'oxts', 'data', '*.txt')))
+        self.oxts_files_sync = _list_files(os.path.join(self.data_path_sync, 'oxts', 'data'), '.txt')
 
         if self.frames is not None:
             self.oxts_files_sync = utils.subselect_files(
                 self.oxts_files_sync, self.frames)
         self.oxts_files_sync = np.asarray(self.oxts_files_sync)
 
-        self.oxts_files_unsync = sorted(glob.glob(
-            os.path.join(self.data_path_unsync, 'oxts', 'data', '*.txt')))
+        self.oxts_files_unsync = _list_files(os.path.join(self.data_path_unsync, 'oxts', 'data'), '.txt')
 
         if self.frames is not None:
             self.oxts_files_unsync = utils.subselect_files(
@@ -159,43 +305,17 @@ class KittiRawData:
         timestamp_file_velo = os.path.join(self.data_path_sync, 'velodyne_points', 'timestamps.txt')
         timestamp_file_sync = os.path.join(self.data_path_sync, 'oxts', 'timestamps.txt')
 
-        # Read and parse the timestamps
-        self.timestamps_unsync = []
-        with open(timestamp_file_unsync, 'r') as f:
-            for line in f.readlines():
-                # NB: datetime only supports microseconds, but KITTI timestamps
-                # give nanoseconds, so need to truncate last 4 characters to
-                # get rid of \n (counts as 1) and extra 3 digits
-                t = dt.datetime.strptime(line[:-4], '%Y-%m-%d %H:%M:%S.%f')
-                self.timestamps_unsync.append(t)
-        self.timestamps_unsync = np.array(self.timestamps_unsync)
-
-        # Read and parse the timestamps
-        self.timestamps_velo = []
-        with open(timestamp_file_velo, 'r') as f:
-            for line in f.readlines():
-                # NB: datetime only supports microseconds, but KITTI timestamps
-                # give nanoseconds, so need to truncate last 4 characters to
-                # get rid of \n (counts as 1) and extra 3 digits
-                t = dt.datetime.strptime(line[:-4], '%Y-%m-%d %H:%M:%S.%f')
-                self.timestamps_velo.append(t)
-        self.timestamps_velo = np.array(self.timestamps_velo)
-
-        # Read and parse the timestamps
-        self.timestamps_sync = []
-        with open(timestamp_file_sync, 'r') as f:
-            for line in f.readlines():
-                # NB: datetime only supports microseconds, but KITTI timestamps
-                # give nanoseconds, so need to truncate last 4 characters to
-                # get rid of \n (counts as 1) and extra 3 digits
-                t = dt.datetime.strptime(line[:-4], '%Y-%m-%d %H:%M:%S.%f')
-                self.timestamps_sync.append(t)
-        self.timestamps_sync = np.array(self.timestamps_sync)
+        self.timestamps_unsync = utils.load_timestamps(timestamp_file_unsync)
+        self.timestamps_velo = utils.load_timestamps(timestamp_file_velo)
+        self.timestamps_sync = utils.load_timestamps(timestamp_file_sync)
+
+        # the unsynced timestamps are not guaranteed to be monotonic, see kitti_time_consistency_test.py
+        self.timestamps_unsync_sorted = bool(np.all(np.diff(self.timestamps_unsync) >= np.timedelta64(0)))
 
     def _load_oxts(self):
         """Load OXTS data from file."""
-        self.oxts_sync = np.array(utils.load_oxts_packets_and_poses(self.oxts_files_sync))
-        self.oxts_unsync = np.array(utils.load_oxts_packets_and_poses(self.oxts_files_unsync))
+        self.oxts_sync = np.array(utils.load_oxts_packets_and_poses(self.oxts_files_sync), dtype=object)
+        self.oxts_unsync = np.array(utils.load_oxts_packets_and_poses(self.oxts_files_unsync), dtype=object)
 
     def _load_oxts_bin(self):
         oxts_file_sync = os.path.join(self.data_path_sync, 'oxts', 'data.pkl')
@@ -206,6 +326,32 @@ class KittiRawData:
         with open(oxts_file_unsync, 'rb') as f:
             self.oxts_unsync = pickle.load(f)
 
+    def _build_oxts_arrays(self):
+        """Extract the values needed for training from the OXTS packets into dense arrays, so the packet
+        objects are not touched anymore when loading samples.
+        """
+        # imu measurements: ax, ay, az, wx, wy, wz
+        self.imu_unsync = np.array([[oxt[0].ax, oxt[0].ay, oxt[0].az,
+                                     oxt[0].wx, oxt[0].wy, oxt[0].wz]
+                                    for oxt in self.oxts_unsync], dtype=np.float32).reshape(-1, 6)
+
+        # ground truth: position (3), rotation matrix (9) and velocity vf, vl, vu (3)
+        self.gt_sync = np.empty((len(self.oxts_sync), 15), dtype=np.float32)
+        for i, oxt in enumerate(self.oxts_sync):
+            T = oxt[1]
+            self.gt_sync[i, 0:3] = T[:3, 3]
+            self.gt_sync[i, 3:12] = T[:3, :3].flatten()
+            self.gt_sync[i, 12:15] = [oxt[0].vf, oxt[0].vl, oxt[0].vu]
+
+    def release_oxts(self):
+        """Drop the OXTS packets, once only the dense arrays built from them are needed.
+
+        The garbage collector walks the packet objects and touches their pages,
+        which are then copied into every forked dataloader worker.
+        """
+        self.oxts_sync = None
+        self.oxts_unsync = None
+
     def _load_oxts_lazy(self, indices):
         oxts = utils.load_oxts_packets_and_poses(self.oxts_files_sync[indices])
         return oxts
@@ -233,6 +379,8 @@ class Kitti(data.Dataset):
         self.mean_imu = ds_config['mean-imu']
         self.std_imu = ds_config['std-imu']
         self.channels = config['channels']
+        self.debug = ds_config.get('debug', False)
+        self.reported_holes = set()
 
         self.has_imu = has_imu
         self.has_lidar = has_lidar
@@ -245,38 +393,27 @@ class Kitti(data.Dataset):
         self.transform = transform
 
         self.datasets = []
-        self.length_each_drive = []
-        self.bins = []
-        self.images = [None] * self.internal_seq_size
 
         root_path_sync = ds_config['root-path-sync']
         root_path_unsync = ds_config['root-path-unsync']
 
-        # Since we are intrested in sequence of lidar frame - e.g. multiple frame at each iteration,
-        # depending on the sequence size and the current wanted index coming from pytorch dataloader
-        # we must switch between each drive if not enough frames exists in that specific drive wanted from dataloader,
-        # therefor we separate valid indices in each drive in bins.
-        last_bin_end = -1
         for date, drives in ds_config[self.ds_type].items():
             for drive in drives:
                 date = str(date).replace('-', '_')
                 drive = '{0:04d}'.format(drive)
                 ds = KittiRawData(root_path_sync, root_path_unsync, date, drive, ds_config_common, oxts_bin=True)
-
-                length = len(ds)
-
-                bin_start = last_bin_end + 1
-                bin_end = bin_start + length - 1
-                self.bins.append([bin_start, bin_end])
-                last_bin_end = bin_end
-
-                self.length_each_drive.append(length)
+                ds.release_oxts()
                 self.datasets.append(ds)
 
-        self.bins = np.asarray(self.bins)
-        self.length_each_drive = np.array(self.length_each_drive)
+        # Since we are intrested in sequence of lidar frame - e.g. multiple frame at each iteration,
+        # depending on the sequence size and the current wanted index coming from pytorch dataloader
+        # we must switch between each drive if not enough frames exists in that specific drive wanted from dataloader,
+        # therefor we separate valid indices in each drive in bins.
+        self.length_each_drive = np.array([len(ds) for ds in self.datasets])
+        self.bin_ends = np.cumsum(self.length_each_drive) - 1
+        self.bins = np.stack((self.bin_ends - self.length_each_drive + 1, self.bin_ends), axis=1)
 
-        self.length = self.bins.flatten()[-1] + 1
+        self.length = int(self.bin_ends[-1]) + 1
 
         self.logger = logger.get_app_logger()
 
@@ -290,97 +427,87 @@ class Kitti(data.Dataset):
         self.internal_seq_size = size + 1
 
     def load_ground_truth(self, dataset, indices):
-        gts_alls = dataset.oxts_sync[indices]
-        gts = []
-        for gt in gts_alls:
-            T = gt[1]
-            x = T[:3, 3].flatten()
-            R = T[:3, :3].flatten()
-            v = np.array([gt[0].vf, gt[0].vl, gt[0].vu])
-            gts.append(np.hstack((x, R, v)))
-        return np.array(gts)
+        return dataset.gt_sync[indices]
 
     def load_images(self, dataset, indices):
-        threads = [None] * self.internal_seq_size
-
-        for i in range(self.internal_seq_size):
-            threads[i] = Thread(target=self.load_image, args=(dataset, indices[i], i))
-            threads[i].start()
+        # all frames are written to one contiguous buffer, so there is no need to stack them later
+        images = np.empty((len(indices), dataset.image_height, dataset.image_width, KittiRawData.NUM_IMAGE_CHANNELS),
+                          dtype=KittiRawData.IMAGE_DTYPE)
 
-        for i in range(self.internal_seq_size):
-            threads[i].join()
+        def load_image(i):
+            dataset.get_velo_image(indices[i], out=images[i])
 
-    def load_image(self, dataset, ds_index, img_index):
-        img = dataset.get_velo_image(ds_index)
-        self.images[img_index] = img
+        # loading and projecting the frames is mostly done in numpy and I/O which release the GIL
+        executor = _get_executor(self.internal_seq_size)
+        list(executor.map(load_image, range(len(indices))))
+        return images
 
     def load_imus(self, dataset, velo_timestamps):
-        imus = []
-        valids = []
-        for i in range(self.internal_seq_size - 1):
-            velo_start_ts = velo_timestamps[i]
-            velo_stop_ts = velo_timestamps[i+1]
+        num_windows = self.internal_seq_size - 1
+        if dataset.timestamps_unsync_sorted:
+            # samples in [start, stop) can be found by binary search instead of scanning all timestamps
+            bounds = np.searchsorted(dataset.timestamps_unsync, velo_timestamps, side='left')
+            windows = [np.arange(bounds[i], bounds[i+1]) for i in range(num_windows)]
+        else:
+            windows = [np.flatnonzero((dataset.timestamps_unsync >= velo_timestamps[i]) &
+                                      (dataset.timestamps_unsync < velo_timestamps[i+1]))
+                       for i in range(num_windows)]
+
+        # gather the imu measurements of the whole sequence at once instead of once per pair of lidar frames
+        imu_values_seq = dataset.imu_unsync[np.concatenate(windows)]
 
-            mask = ((dataset.timestamps_unsync >= velo_start_ts) & (dataset.timestamps_unsync < velo_stop_ts))
-            oxt_indices = np.argwhere(mask).flatten()
+        # windows with less samples are zero padded, windows with more samples are truncated
+        imus = np.zeros((num_windows, self.DEFAULT_NUM_OXT_SAMPLES, 6), dtype=np.float32)
+        valids = []
+        oxt_start = 0
+        for i, oxt_indices in enumerate(windows):
             len_oxt = len(oxt_indices)
 
             if (len_oxt== 0):
-                self.logger.debug("No OXT-samples: DS: {}_{}, len:{}, velo-timestamps: {}-{}".
-                                  format(dataset.date, dataset.drive, len_oxt, velo_start_ts, velo_stop_ts))
-                imu_values = np.zeros((self.DEFAULT_NUM_OXT_SAMPLES, 6), dtype=np.float)
+                # each hole is hit by every sequence containing it, so it is only reported once
+                hole = (dataset.date, dataset.drive, velo_timestamps[i])
+                if self.debug and hole not in self.reported_holes:
+                    self.reported_holes.add(hole)
+                    self.logger.debug("No OXT-samples: DS: {}_{}, len:{}, velo-timestamps: {}-{}".
+                                      format(dataset.date, dataset.drive, len_oxt, velo_timestamps[i], velo_timestamps[i+1]))
                 valids.append(False)
             else:
-                oxts = dataset.oxts_unsync[oxt_indices]
-                imu_values = np.array([[oxt[0].ax, oxt[0].ay, oxt[0].az,
-                                        oxt[0].wx, oxt[0].wy, oxt[0].wz]
-                                       for oxt in oxts], dtype=np.float)
-                imu_values = np.pad(imu_values, ((0, np.maximum(self.DEFAULT_NUM_OXT_SAMPLES - len_oxt, 0).astype(np.int)), (0, 0)))
-                if self.DEFAULT_NUM_OXT_SAMPLES < len_oxt:
-                    imu_values = imu_values[0:self.DEFAULT_NUM_OXT_SAMPLES, :]
+                len_valid = min(len_oxt, self.DEFAULT_NUM_OXT_SAMPLES)
+                imus[i, :len_valid] = imu_values_seq[oxt_start:oxt_start + len_valid]
                 valids.append(True)
-            imus.append(imu_values)
+            oxt_start += len_oxt
         return imus, valids
 
-    def transform_images(self):
-        imgs_org = torch.stack([torch.from_numpy(im.transpose(2, 0, 1)) for im in self.images])
-        imgs_org = imgs_org[:, self.channels]
+    def transform_images(self, images):
+        """
+        :param images: stacked images of dimension [TxHxWxC]
+        :return: original and normalized images of dimension [TxCxHxW], both in half precision
+        """
+        imgs = torch.from_numpy(images).permute(0, 3, 1, 2)
+        imgs_org = imgs[:, self.channels]
 
         ct, cl = self.crop_top, self.crop_left
+        _, _, h, w = imgs.shape
         mean = torch.as_tensor(self.mean_img)
-        std = torch.as_tensor(self.std_img)
-        if ct > 0 and cl == 0:
-            imgs_normalized = [torch.from_numpy(img[ct:-ct, :, :].transpose(2, 0, 1)) for img in self.images]
-        elif ct > 0 and cl >  0:
-            imgs_normalized = [torch.from_numpy(img[ct:-ct, cl:-cl, :].transpose(2, 0, 1)) for img in self.images]
-        elif ct == 0 and cl > 0:
-            imgs_normalized = [torch.from_numpy(img[:, cl:-cl, :].transpose(2, 0, 1)) for img in self.images]
-        else:
-            imgs_normalized = [torch.from_numpy(img.transpose(2, 0, 1)) for img in self.images]
-        imgs_normalized = torch.stack(imgs_normalized)
-        imgs_normalized.sub_(mean[None, :, None, None])
-        imgs_normalized = imgs_normalized[:, self.channels]
+        imgs_normalized = imgs[:, self.channels, ct:h - ct, cl:w - cl].float() - mean[None, self.channels, None, None]
+        imgs_normalized = imgs_normalized.to(imgs.dtype)
 
-        return imgs_org, imgs_normalized
+        # contiguous tensors are stacked and pinned by the dataloader without another copy
+        return imgs_org.contiguous(), imgs_normalized.contiguous()
 
     def transform_imus(self, imus):
-        imus_norm = [torch.from_numpy((imu - self.mean_imu) / self.std_imu).type(torch.float32) for imu in imus]
+        mean = np.asarray(self.mean_imu, dtype=np.float32)
+        std = np.asarray(self.std_imu, dtype=np.float32)
+        imus_norm = torch.from_numpy((imus - mean) / std)
         return imus_norm
 
     def get_dataset_and_index(self, index):
-        idx = -1
-        num_drive = -1
-        for i, bin in enumerate(self.bins):
-            bin_start = bin[0]
-            bin_end = bin[1]
-            if bin_start <= index <= bin_end:
-                idx = index - bin_start
-                num_drive = i
-                break
-
-        if idx < 0 or num_drive < 0:
+        # bins are sorted and contiguous, so the drive is the first one whose bin ends at or after the index
+        num_drive = int(np.searchsorted(self.bin_ends, index, side='left'))
+        if index < 0 or num_drive >= len(self.datasets):
             self.logger.error("Error: No bins and no drive number found!")
             return None
+        idx = int(index - self.bins[num_drive, 0])
 
         dataset = self.datasets[num_drive]
 
@@ -398,14 +525,14 @@ class Kitti(data.Dataset):
     def create_imu_data(self, dataset, indices, velo_timespamps):
         # load and transform imus
         imus, valids = self.load_imus(dataset, velo_timespamps)
-        imus = torch.stack(self.transform_imus(imus))
+        imus = self.transform_imus(imus)
         data = {'imus': imus, 'valids': valids}
         return data
 
     def create_lidar_data(self, dataset, indices, velo_timespamps):
         # load and transform images
-        self.load_images(dataset, indices)
-        org_images, proc_images = self.transform_images()
+        images = self.load_images(dataset, indices)
+        org_images, proc_images = self.transform_images(images)
         data = {'images': proc_images, 'untrans-images': org_images}
         return data
 
@@ -422,11 +549,10 @@ class Kitti(data.Dataset):
         if torch.is_tensor(index):
             index = index.tolist()
 
-        start = time.time()
         dataset, indices = self.get_dataset_and_index(index)
 
         # Get frame timestamps
-        velo_timespamps = [dataset.timestamps_velo[idx] for idx in indices]
+        velo_timespamps = dataset.timestamps_velo[indices]
 
         lidar_data = {}
         if self.has_lidar:
@@ -439,17 +565,12 @@ class Kitti(data.Dataset):
         arch_data = {**imu_data, **lidar_data}
 
         # load and transform ground truth
-        gts = torch.from_numpy(self.load_ground_truth(dataset, indices)).type(torch.float32)
+        gts = torch.from_numpy(self.load_ground_truth(dataset, indices))
 
         meta_data = {'index': [index], 'date': [dataset.date], 'drive': [dataset.drive], 'velo-index': [indices],
-                     'velo-timestamps': [ts.timestamp() for ts in velo_timespamps]}
+                     'velo-timestamps': (velo_timespamps.astype(np.int64) * 1e-9).tolist()}
 
         data = {'data': arch_data, 'gts': gts, 'meta': meta_data}
-
-        end = time.time()
-
-        #print(index, dataset.data_path, indices)
-        #self.logger.debug("Idx:{}, dt: {}".format(index, end - start))
         return data
 
     def __repr__(self):
@@ -34,12 +34,13 @@ class DataCombiCreater(object):
         has_imu = 'imus' in data
 
         if has_imgs:
-            imgs, normals = self.process_images(data['images'].to(self.device))
-            imgs_org, normals_org = self.process_images(data['untrans-images'].to(self.device))
+            # images are loaded in half precision to reduce the data transfers
+            imgs, normals = self.process_images(data['images'].to(self.device, non_blocking=True).float())
+            imgs_org, normals_org = self.process_images(data['untrans-images'].to(self.device, non_blocking=True).float())
 
         # only in deeplio and deepio we have imus
         if has_imu:
-            imus = data['imus'].to(self.device)
+            imus = data['imus'].to(self.device, non_blocking=True)
 
         n_batches = len(data['gts'])
         for b in range(n_batches):
@@ -49,7 +50,7 @@ class DataCombiCreater(object):
             gt_f2g.append(gts_glob)
 
 
-        gt_global = data['gts'].to(self.device)
+        gt_global = data['gts'].to(self.device, non_blocking=True)
         gt_f2f = torch.stack(gt_f2f).to(self.device, non_blocking=True)
         gt_f2g = torch.stack(gt_f2g).to(self.device, non_blocking=True)
 
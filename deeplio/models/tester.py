@@ -62,7 +62,8 @@ class Tester(Worker):
                                                            num_workers=self.num_workers,
                                                            shuffle=False,
                                                            worker_init_fn = worker_init_fn,
-                                                           collate_fn = ds.deeplio_collate)
+                                                           collate_fn = ds.deeplio_collate,
+                                                           pin_memory=self.pin_memory)
 
         self.data_permuter = DataCombiCreater(combinations=self.combinations,
                                               device=self.device)
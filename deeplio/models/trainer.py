@@ -67,6 +67,7 @@ class Trainer(Worker):
                                                             shuffle=True,
                                                             worker_init_fn=worker_init_fn,
                                                             collate_fn=ds.deeplio_collate,
+                                                            pin_memory=self.pin_memory,
                                                             drop_last=True)
 
         self.val_dataset = ds.Kitti(config=self.cfg, transform=transform, ds_type='validation',
@@ -76,6 +77,7 @@ class Trainer(Worker):
                                                           shuffle=True,
                                                           worker_init_fn=worker_init_fn,
                                                           collate_fn = ds.deeplio_collate,
+                                                          pin_memory=self.pin_memory,
                                                           drop_last=True)
 
         self.data_permuter = DataCombiCreater(combinations=self.combinations,
@@ -461,7 +463,7 @@ class TrainerDeepLIO(Trainer):
         if self.has_lidar:
             # save infos to -e.g. gradient hists and images to tensorbaord and the end of training
             b, s, c, h, w = np.asarray(self.data_last['images'].shape)
-            imgs = self.data_last['images'].reshape(b*s, c, h, w)
+            imgs = self.data_last['images'].reshape(b*s, c, h, w).float()
             imgs_remossion = imgs[:, 1, :, :]
             imgs_remossion = [torch.from_numpy(utils.colorize(img)).permute(2, 0, 1) for img in imgs_remossion]
             imgs_remossion = torch.stack(imgs_remossion)
@@ -52,6 +52,8 @@ class Worker:
 
         self.batch_size = self.args.batch_size
         self.num_workers = self.args.workers
+        # batches in page-locked memory can be copied asynchronously to the gpu
+        self.pin_memory = torch.device(self.device).type == 'cuda'
 
         # get input images shape and channels
         crop_height, crop_width = self.curr_dataset_cfg.get('crop-factors', [0, 0])
@@ -63,7 +63,7 @@ def main(args):
 
     # Iterate through datset and save images
     for idx, data in enumerate(dataloader):
-        ims = data['untrans-images'].detach().cpu()
+        ims = data['untrans-images'].detach().cpu().float()
         for b in range(len(ims)):
             metas = data['metas'][b]
             index = metas['index'][0]
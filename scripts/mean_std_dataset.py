@@ -30,7 +30,7 @@ def run_job(args):
     dataset = args[1]
 
     # get imu values
-    indices = range(len(dataset.oxts_unsync))
+    indices = range(len(dataset.imu_unsync))
     imus = dataset.get_imu_values(indices)
 
     # get velodyne images
@@ -45,7 +45,9 @@ def run_job(args):
     counter = 0
 
     for i in tqdm.trange(length, desc=dataset.data_path_sync, position=bar_pos):
-        im = dataset.get_velo_image(i)
+        # images can be shared with the projection cache, so copy before changing them in-place,
+        # also sum up in single precision, since the half precision images would overflow
+        im = dataset.get_velo_image(i).astype(np.float32)
         if cmd_args['inv_depth']:
             im_depth = im[:, :, -1]
             im_depth[im_depth > 0.] = 1 / im_depth[im_depth > 0.]
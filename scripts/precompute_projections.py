@@ -0,0 +1,54 @@
+import argparse
+import os
+import sys
+from multiprocessing import Pool
+
+import yaml
+
+dname = os.path.dirname(__file__)
+module_dir = os.path.abspath("{}/deeplio".format(dname))
+content_dir = os.path.abspath("{}/..".format(dname))
+sys.path.append(dname)
+sys.path.append(module_dir)
+sys.path.append(content_dir)
+
+from deeplio.datasets import KittiRawData
+
+
+def precompute(dataset):
+    print("Processing {}_{}".format(dataset.date, dataset.drive))
+    dataset.precompute_projections()
+    print("{}_{} done!".format(dataset.date, dataset.drive))
+
+
+def main(args):
+    with open(args['config']) as f:
+        config = yaml.safe_load(f)
+
+    ds_config = config['datasets']
+    kitti_config = ds_config['kitti']
+    root_path_sync = kitti_config['root-path-sync']
+    root_path_unsync = kitti_config['root-path-unsync']
+
+    # a drive can be part of several splits, but it must be projected only once
+    drives = set()
+    for ds_type in ['train', 'validation', 'test']:
+        for date, drive_nums in kitti_config.get(ds_type, {}).items():
+            for drive in drive_nums:
+                drives.add((str(date).replace('-', '_'), '{0:04d}'.format(drive)))
+
+    datasets = [KittiRawData(root_path_sync, root_path_unsync, date, drive, ds_config, oxts_bin=True)
+                for date, drive in sorted(drives)]
+
+    procs = Pool(processes=len(datasets))
+    procs.map(precompute, datasets)
+    procs.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Precompute spherical projections of the KITTI lidar frames')
+    parser.add_argument('-c', '--config', default="../config.yaml", help='configuration file')
+
+    args = vars(parser.parse_args())
+    main(args)
+    print("done!")